@@ -1,103 +1,236 @@
-import os
-from dotenv import load_dotenv
-import requests
-import time
-import threading
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import httpx
+import orjson
 import signal
+import socket
 import sys
+from typing import Dict, Optional
 
 # Load environment variables FIRST
-load_dotenv()
+from config import API_KEY, PORT, KEEPALIVE_URL, KEEPALIVE_INTERVAL, BEARER_TOKEN
 
 # Test if loading worked
-api_key = os.getenv("OPENAI_API_KEY")
-print(f"✅ API Key loaded: {'Yes' if api_key else 'No'}")
-if api_key:
-    print(f"✅ API Key starts with: {api_key[:10]}...")
+print(f"✅ API Key loaded: {'Yes' if API_KEY else 'No'}")
+if API_KEY:
+    print(f"✅ API Key starts with: {API_KEY[:10]}...")
 
+import fastmcp
 import uvicorn
-from mcp_server import mcp
+from mcp_server import mcp, load_token_encoding
+from http_client import get_client, close_client
+
+# ⚡ FAST EVENT LOOP + HTTP PARSER when available (uvloop isn't on Windows)
+try:
+    import uvloop  # noqa: F401
+    UVICORN_LOOP = "uvloop"
+except ImportError:
+    UVICORN_LOOP = "asyncio"
+
+try:
+    import httptools  # noqa: F401
+    UVICORN_HTTP = "httptools"
+except ImportError:
+    UVICORN_HTTP = "h11"
 
 # Get the pure MCP app - NO CUSTOM ROUTES
-app = mcp.http_app()
+MCP_PATH = fastmcp.settings.streamable_http_path
+app = mcp.http_app(path=MCP_PATH)
+
+# 🧵 SHARED BACKGROUND POOL - all blocking work (asyncio.to_thread etc.) lands here
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bg")
+
+KEEPALIVE_HEADERS = {
+    "Authorization": f"Bearer {BEARER_TOKEN}",
+    "Content-Type": "application/json",
+    # Streamable HTTP rejects (406) clients that don't accept both reply formats
+    "Accept": "application/json, text/event-stream"
+}
+
+# Serialized once - the in-process MCP handshake and warm-up call never change
+INITIALIZE_BODY = orjson.dumps({
+    "jsonrpc": "2.0",
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-03-26",
+        "capabilities": {},
+        "clientInfo": {"name": "keep-alive", "version": "1.0.0"}
+    },
+    "id": 0
+})
+INITIALIZED_BODY = orjson.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"})
+VALIDATE_BODY = orjson.dumps({
+    "jsonrpc": "2.0",
+    "method": "tools/call",
+    "params": {"name": "validate", "arguments": {}},
+    "id": 1
+})
+
+async def open_mcp_session(internal_client: httpx.AsyncClient) -> Optional[Dict[str, str]]:
+    """Run the MCP initialize handshake in-process; headers for later calls, None on failure"""
+    response = await internal_client.post(MCP_PATH, content=INITIALIZE_BODY)
+    if not response.is_success:
+        print(f"⚠️ Internal keep-alive WARNING: initialize returned {response.status_code}")
+        return None
+
+    # No session id means the server runs stateless - calls then need no header
+    session_id = response.headers.get("mcp-session-id")
+    session = {"mcp-session-id": session_id} if session_id else {}
+    await internal_client.post(MCP_PATH, content=INITIALIZED_BODY, headers=session)
+    return session
 
 # 🔄 IMPROVED KEEP-ALIVE FUNCTION
-def keep_server_alive():
-    """Enhanced keep-alive function with better error handling"""
-    base_url = "https://agriadvisormcp.onrender.com"
-    
-    def ping_server():
-        consecutive_failures = 0
-        max_failures = 3
-        
-        while True:
+async def ping_loop(
+    client: httpx.AsyncClient,
+    internal_client: httpx.AsyncClient,
+    base_url: str,
+    interval: int
+):
+    """Enhanced keep-alive loop running on uvicorn's event loop"""
+    consecutive_failures = 0
+    max_failures = 3
+    session: Optional[Dict[str, str]] = None  # in-process MCP session, opened lazily
+
+    # Fixed cadence on the loop's monotonic clock - request time doesn't drift the schedule
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+
+    while True:
+        try:
+            next_tick = max(next_tick + interval, loop.time())  # skip missed ticks
+            await asyncio.sleep(next_tick - loop.time())
+
+            # Warm the MCP tool path in-process - no network, no TLS
             try:
-                time.sleep(600)  # 10 minutes (safer interval)
-                
-                # Try root endpoint (MCP servers respond to root with tools info)
-                try:
-                    response = requests.post(
-                        base_url,
-                        headers={
-                            "Authorization": "Bearer puch2024",
-                            "Content-Type": "application/json"
-                        },
-                        json={
-                            "jsonrpc": "2.0",
-                            "method": "tools/call",
-                            "params": {"name": "validate", "arguments": {}},
-                            "id": 1
-                        },
-                        timeout=30
-                    )
-                    
-                    if response.status_code in [200, 202]:
-                        print(f"🔄 Keep-alive SUCCESS: {response.status_code}")
-                        consecutive_failures = 0
-                    else:
-                        print(f"⚠️ Keep-alive WARNING: {response.status_code}")
-                        consecutive_failures += 1
-                        
-                except requests.exceptions.RequestException as e:
-                    print(f"⚠️ Keep-alive ERROR: {str(e)}")
+                if session is None:
+                    session = await open_mcp_session(internal_client)
+                if session is not None:
+                    response = await internal_client.post(MCP_PATH, content=VALIDATE_BODY, headers=session)
+                    if not response.is_success:
+                        print(f"⚠️ Internal keep-alive WARNING: {response.status_code}")
+                        session = None  # e.g. a session the server no longer knows - handshake again
+            except httpx.HTTPError as e:
+                print(f"⚠️ Internal keep-alive ERROR: {str(e)}")
+                session = None
+
+            # One bodyless request to reset Render's external idle timer
+            try:
+                response = await client.head(base_url, timeout=10)
+
+                if response.status_code < 500:
+                    print(f"🔄 Keep-alive SUCCESS: {response.status_code}")
+                    consecutive_failures = 0
+                else:
+                    print(f"⚠️ Keep-alive WARNING: {response.status_code}")
                     consecutive_failures += 1
-                
-                if consecutive_failures >= max_failures:
-                    print("🚨 Multiple keep-alive failures - server may be down")
-                    consecutive_failures = 0  # Reset counter
-                        
-            except Exception as e:
-                print(f"❌ Keep-alive EXCEPTION: {str(e)}")
-                time.sleep(60)  # Wait before retrying on exception
-    
-    # Start daemon thread
-    thread = threading.Thread(target=ping_server, daemon=True, name="KeepAliveThread")
-    thread.start()
-    print("🔄 Enhanced keep-alive service started (10-min interval)")
-    return thread
+
+            except httpx.HTTPError as e:
+                print(f"⚠️ Keep-alive ERROR: {str(e)}")
+                consecutive_failures += 1
+
+            if consecutive_failures >= max_failures:
+                print("🚨 Multiple keep-alive failures - server may be down")
+                consecutive_failures = 0  # Reset counter
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Keep-alive EXCEPTION: {str(e)}")
+            await asyncio.sleep(60)  # Wait before retrying on exception
+
+# 🔁 LIFESPAN - start/stop keep-alive alongside the MCP session manager
+mcp_lifespan = app.router.lifespan_context
+
+@asynccontextmanager
+async def lifespan(app):
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(_EXECUTOR)
+    # Tokenizer may download its BPE file - fetch it in the background, never on the loop
+    loop.run_in_executor(None, load_token_encoding)
+
+    async with mcp_lifespan(app):
+        # Same HTTP/2 client OpenAI and the services use for outbound calls
+        app.state.client = get_client()
+        app.state.ka_task = None
+        app.state.internal_client = None
+
+        # Keep-alive only makes sense on the hosted deployment
+        base_url = KEEPALIVE_URL
+        if base_url:
+            # One canonical endpoint - "", "/" and "//" all hit the same route
+            base_url = f"{base_url.rstrip('/')}/"
+            interval = KEEPALIVE_INTERVAL
+            app.state.internal_client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://internal",
+                headers=KEEPALIVE_HEADERS
+            )
+            app.state.ka_task = asyncio.create_task(
+                ping_loop(app.state.client, app.state.internal_client, base_url, interval),
+                name="keep-alive"
+            )
+            print(f"🔄 Enhanced keep-alive service started ({interval}s interval)")
+
+        try:
+            yield
+        finally:
+            if app.state.ka_task is not None:
+                app.state.ka_task.cancel()
+                try:
+                    await app.state.ka_task
+                except asyncio.CancelledError:
+                    pass
+            if app.state.internal_client is not None:
+                await app.state.internal_client.aclose()
+            await close_client()
+
+app.router.lifespan_context = lifespan
 
 # 🛡️ GRACEFUL SHUTDOWN HANDLER
+_SIG_NAMES = {signal.SIGTERM: "SIGTERM", signal.SIGINT: "SIGINT"}
+
 def signal_handler(sig, frame):
-    print(f"\n🛑 Received signal {sig} - Shutting down gracefully...")
+    name = _SIG_NAMES.get(sig, str(sig))
+    print(f"\n🛑 Received {name} - Shutting down gracefully...")
+    _EXECUTOR.shutdown(wait=False, cancel_futures=True)
     sys.exit(0)
 
 # Register signal handlers
 signal.signal(signal.SIGTERM, signal_handler)
 signal.signal(signal.SIGINT, signal_handler)
 
+# 🔌 LISTEN SOCKET - no Nagle delay on small JSON-RPC replies, reap dead peers
+def make_listen_socket(port: int) -> socket.socket:
+    """Create the server socket with TCP_NODELAY and OS-level keepalive"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+    # Linux-only knobs: detect a dead peer in ~90s (60s idle + 3 x 10s probes)
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+
+    sock.bind(("0.0.0.0", port))
+    sock.listen(2048)
+    return sock
+
 if __name__ == "__main__":
-    # Start keep-alive service BEFORE starting server
-    keep_alive_thread = keep_server_alive()
-    
-    port = int(os.getenv("PORT", 8000))
-    print(f"🚀 Starting server on port {port}")
-    
+    port = PORT
+    print(f"🚀 Starting server on port {port} ({UVICORN_LOOP} + {UVICORN_HTTP})")
+
+    sock = make_listen_socket(port)
+
     try:
         uvicorn.run(
             "app:app",
-            host="0.0.0.0",
-            port=port,
+            fd=sock.fileno(),
             reload=False,
+            loop=UVICORN_LOOP,
+            http=UVICORN_HTTP,
             access_log=True,
             log_level="info"
         )
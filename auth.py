@@ -1,13 +1,13 @@
-import os
 from typing import Optional
 
+from config import BEARER_TOKEN, MY_NUMBER
+
 
 def verify_bearer_token(token: Optional[str]) -> bool:
     """Verify the bearer token for authentication"""
-    expected_token = os.getenv("BEARER_TOKEN", "puch2024")
-    return token == expected_token
+    return token == BEARER_TOKEN
 
 
 def get_my_number() -> str:
     """Get the phone number in required format"""
-    return os.getenv("MY_NUMBER", "918920560661")
+    return MY_NUMBER
@@ -1,13 +1,28 @@
 import requests
-import json
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 
 BASE_URL = "http://localhost:8000"
 BEARER_TOKEN = "puch2024"
 
-headers = {
+# Single session so both diagnostic calls share one keep-alive connection
+SESSION = requests.Session()
+SESSION.headers.update({
     "Authorization": f"Bearer {BEARER_TOKEN}",
     "Content-Type": "application/json"
-}
+})
+
+# JSON-RPC bodies serialized once - they never change between calls
+_LIST_BODY = orjson.dumps({"jsonrpc": "2.0", "method": "tools/list", "id": 1})
+_HC_BODY = orjson.dumps({
+    "jsonrpc": "2.0",
+    "method": "tools/call",
+    "params": {
+        "name": "health_check",
+        "arguments": {}
+    },
+    "id": 1
+})
 
 def check_mcp_server():
     """Check MCP server using proper JSON-RPC protocol"""
@@ -15,16 +30,12 @@ def check_mcp_server():
     
     # Test server response
     try:
-        response = requests.post(BASE_URL, headers=headers, json={
-            "jsonrpc": "2.0",
-            "method": "tools/list",
-            "id": 1
-        }, timeout=10)
+        response = SESSION.post(BASE_URL, data=_LIST_BODY, timeout=10)
         
         print(f"Server Response: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             tools = data.get("result", {}).get("tools", [])
             print(f"✅ MCP Server Working! Found {len(tools)} tools:")
             
@@ -47,23 +58,13 @@ def test_simple_tool():
     """Test a simple diagnostic tool"""
     print("\n🧪 Testing Simple Tool...")
     
-    payload = {
-        "jsonrpc": "2.0",
-        "method": "tools/call",
-        "params": {
-            "name": "health_check",
-            "arguments": {}
-        },
-        "id": 1
-    }
-    
     try:
-        response = requests.post(BASE_URL, headers=headers, json=payload, timeout=30)
+        response = SESSION.post(BASE_URL, data=_HC_BODY, timeout=30)
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
             print("✅ Tool execution working!")
-            data = response.json()
+            data = orjson.loads(response.content)
             print(f"📊 Response structure: {list(data.keys())}")
         else:
             print(f"❌ Tool Error: {response.text}")
@@ -74,11 +75,15 @@ if __name__ == "__main__":
     print("🔍 MCP Server Diagnostic Check")
     print("=" * 40)
     
-    tools = check_mcp_server()
-    if tools:
-        test_simple_tool()
-    else:
-        print("❌ Cannot test tools - server not responding")
+    # Both checks are independent - overlap their round trips on the shared session
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        tools_future = executor.submit(check_mcp_server)
+        tool_future = executor.submit(test_simple_tool)
+        tools = tools_future.result()
+        tool_future.result()
+
+    if not tools:
+        print("❌ Cannot list tools - server not responding")
     
     print("\n💡 Note: 404 errors on /tools, /docs etc. are NORMAL for FastMCP servers!")
     print("✅ FastMCP uses JSON-RPC protocol, not REST endpoints")
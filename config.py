@@ -0,0 +1,20 @@
+"""
+Process configuration - .env is parsed once here and read everywhere else
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+API_KEY = os.environ.get("OPENAI_API_KEY")
+OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o")
+PORT = int(os.environ.get("PORT", 8000))
+KEEPALIVE_URL = os.environ.get("KEEPALIVE_URL")
+KEEPALIVE_INTERVAL = int(os.environ.get("KEEPALIVE_INTERVAL", "600"))
+BEARER_TOKEN = os.environ.get("BEARER_TOKEN", "puch2024")
+MY_NUMBER = os.environ.get("MY_NUMBER", "918920560661")
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_RPM = int(os.environ.get("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.environ.get("OPENAI_TPM", "30000"))
+OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", "60"))
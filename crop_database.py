@@ -1,75 +1,93 @@
 """
 Indian crop database with region-specific information
 """
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Tuple
+
+
+@dataclass(slots=True, frozen=True)
+class CropInfo:
+    """Static agronomic profile of a crop"""
+    hindi_name: str
+    seasons: Tuple[str, ...]
+    planting_months: Tuple[int, ...]
+    harvesting_months: Tuple[int, ...]
+    suitable_states: Tuple[str, ...]
+    soil_type: str
+    water_requirement: str
+    common_diseases: Tuple[str, ...]
+    market_season: str
 
-INDIAN_CROPS = {
-    "rice": {
-        "hindi_name": "धान/चावल",
-        "seasons": ["kharif"],
-        "planting_months": [6, 7, 8],
-        "harvesting_months": [10, 11, 12],
-        "suitable_states": ["West Bengal", "Punjab", "Uttar Pradesh", "Andhra Pradesh", "Bihar"],
-        "soil_type": "Clay loam, alluvial",
-        "water_requirement": "High",
-        "common_diseases": ["blast", "brown_spot", "sheath_blight"],
-        "market_season": "November-February"
-    },
-    "wheat": {
-        "hindi_name": "गेहूं",
-        "seasons": ["rabi"],
-        "planting_months": [11, 12, 1],
-        "harvesting_months": [3, 4, 5],
-        "suitable_states": ["Punjab", "Haryana", "Uttar Pradesh", "Madhya Pradesh"],
-        "soil_type": "Loam, clay loam",
-        "water_requirement": "Medium",
-        "common_diseases": ["rust", "smut", "bunt"],
-        "market_season": "April-June"
-    },
-    "cotton": {
-        "hindi_name": "कपास",
-        "seasons": ["kharif"],
-        "planting_months": [5, 6, 7],
-        "harvesting_months": [10, 11, 12],
-        "suitable_states": ["Gujarat", "Maharashtra", "Karnataka", "Andhra Pradesh"],
-        "soil_type": "Black cotton soil",
-        "water_requirement": "Medium",
-        "common_diseases": ["bollworm", "leaf_curl", "root_rot"],
-        "market_season": "November-February"
-    },
-    "sugarcane": {
-        "hindi_name": "गन्ना",
-        "seasons": ["annual"],
-        "planting_months": [2, 3, 10, 11],
-        "harvesting_months": [12, 1, 2, 3],
-        "suitable_states": ["Uttar Pradesh", "Maharashtra", "Karnataka", "Tamil Nadu"],
-        "soil_type": "Deep fertile loam",
-        "water_requirement": "Very High",
-        "common_diseases": ["red_rot", "smut", "wilt"],
-        "market_season": "December-April"
-    },
-    "tomato": {
-        "hindi_name": "टमाटर",
-        "seasons": ["kharif", "rabi"],
-        "planting_months": [6, 7, 11, 12],
-        "harvesting_months": [9, 10, 2, 3],
-        "suitable_states": ["Karnataka", "Uttar Pradesh", "Bihar", "West Bengal"],
-        "soil_type": "Well-drained loam",
-        "water_requirement": "Medium",
-        "common_diseases": ["early_blight", "late_blight", "leaf_curl"],
-        "market_season": "Year-round"
-    },
-    "onion": {
-        "hindi_name": "प्याज",
-        "seasons": ["rabi", "kharif"],
-        "planting_months": [6, 7, 11, 12],
-        "harvesting_months": [10, 11, 3, 4],
-        "suitable_states": ["Maharashtra", "Karnataka", "Gujarat", "Uttar Pradesh"],
-        "soil_type": "Well-drained loam",
-        "water_requirement": "Medium",
-        "common_diseases": ["purple_blotch", "downy_mildew", "basal_rot"],
-        "market_season": "April-June, November-January"
-    }
-}
+
+INDIAN_CROPS = MappingProxyType({
+    "rice": CropInfo(
+        hindi_name="धान/चावल",
+        seasons=("kharif",),
+        planting_months=(6, 7, 8),
+        harvesting_months=(10, 11, 12),
+        suitable_states=("West Bengal", "Punjab", "Uttar Pradesh", "Andhra Pradesh", "Bihar"),
+        soil_type="Clay loam, alluvial",
+        water_requirement="High",
+        common_diseases=("blast", "brown_spot", "sheath_blight"),
+        market_season="November-February"
+    ),
+    "wheat": CropInfo(
+        hindi_name="गेहूं",
+        seasons=("rabi",),
+        planting_months=(11, 12, 1),
+        harvesting_months=(3, 4, 5),
+        suitable_states=("Punjab", "Haryana", "Uttar Pradesh", "Madhya Pradesh"),
+        soil_type="Loam, clay loam",
+        water_requirement="Medium",
+        common_diseases=("rust", "smut", "bunt"),
+        market_season="April-June"
+    ),
+    "cotton": CropInfo(
+        hindi_name="कपास",
+        seasons=("kharif",),
+        planting_months=(5, 6, 7),
+        harvesting_months=(10, 11, 12),
+        suitable_states=("Gujarat", "Maharashtra", "Karnataka", "Andhra Pradesh"),
+        soil_type="Black cotton soil",
+        water_requirement="Medium",
+        common_diseases=("bollworm", "leaf_curl", "root_rot"),
+        market_season="November-February"
+    ),
+    "sugarcane": CropInfo(
+        hindi_name="गन्ना",
+        seasons=("annual",),
+        planting_months=(2, 3, 10, 11),
+        harvesting_months=(12, 1, 2, 3),
+        suitable_states=("Uttar Pradesh", "Maharashtra", "Karnataka", "Tamil Nadu"),
+        soil_type="Deep fertile loam",
+        water_requirement="Very High",
+        common_diseases=("red_rot", "smut", "wilt"),
+        market_season="December-April"
+    ),
+    "tomato": CropInfo(
+        hindi_name="टमाटर",
+        seasons=("kharif", "rabi"),
+        planting_months=(6, 7, 11, 12),
+        harvesting_months=(9, 10, 2, 3),
+        suitable_states=("Karnataka", "Uttar Pradesh", "Bihar", "West Bengal"),
+        soil_type="Well-drained loam",
+        water_requirement="Medium",
+        common_diseases=("early_blight", "late_blight", "leaf_curl"),
+        market_season="Year-round"
+    ),
+    "onion": CropInfo(
+        hindi_name="प्याज",
+        seasons=("rabi", "kharif"),
+        planting_months=(6, 7, 11, 12),
+        harvesting_months=(10, 11, 3, 4),
+        suitable_states=("Maharashtra", "Karnataka", "Gujarat", "Uttar Pradesh"),
+        soil_type="Well-drained loam",
+        water_requirement="Medium",
+        common_diseases=("purple_blotch", "downy_mildew", "basal_rot"),
+        market_season="April-June, November-January"
+    )
+})
 
 INDIAN_STATES_CLIMATE = {
     "Punjab": {"type": "subtropical", "rainfall": "medium", "temperature": "moderate"},
@@ -84,6 +102,20 @@ INDIAN_STATES_CLIMATE = {
     "Andhra Pradesh": {"type": "tropical", "rainfall": "medium", "temperature": "hot_humid"}
 }
 
+# Per-crop calendar lookups - next planting month indexed by current month - 1
+# (wraps into next year), and O(1) "is this state suitable?" checks
+NEXT_PLANTING_MONTH = MappingProxyType({
+    c: tuple(
+        min((x for x in v.planting_months if x >= m), default=min(v.planting_months))
+        for m in range(1, 13)
+    )
+    for c, v in INDIAN_CROPS.items()
+})
+
+SUITABLE_STATES = MappingProxyType({
+    c: frozenset(v.suitable_states) for c, v in INDIAN_CROPS.items()
+})
+
 DISEASE_TREATMENTS = {
     "blast": {
         "hindi_name": "ब्लास्ट रोग",
@@ -0,0 +1,28 @@
+import httpx
+from typing import Optional
+
+# Shared HTTP/2 client - one pooled TLS connection per host for all outbound calls
+# (OpenAI, weather and market APIs).
+# max_keepalive_connections must stay >= 1 or sockets won't survive between calls.
+# A reused keep-alive socket also skips getaddrinfo - DNS is only resolved on a new dial,
+# so keepalive_expiry doubles as the effective DNS cache lifetime.
+_client: Optional[httpx.AsyncClient] = None
+
+def get_client() -> httpx.AsyncClient:
+    """Get the shared outbound HTTP client, creating it on first use (no event loop needed)"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=True,
+            # Fail fast on a dead weather/market host; OpenAI passes its own timeout
+            timeout=httpx.Timeout(5.0, connect=2.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=300)
+        )
+    return _client
+
+async def close_client() -> None:
+    """Close the shared outbound HTTP client on shutdown"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,83 +1,105 @@
 import httpx
-from typing import Dict, Any, List
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, List, NamedTuple, Optional
 import json
-from datetime import datetime
+
+from crop_database import INDIAN_CROPS
+from http_client import get_client
+
+# Mock market data - in production, integrate with actual APIs
+# Read-only all the way down: entries are returned by reference and shared via the market cache
+_MOCK_PRICES = MappingProxyType({
+    crop: MappingProxyType({"price_per_quintal": price, "trend": trend, "markets": markets})
+    for crop, price, trend, markets in (
+        ("rice", 2100, "stable", ("Delhi", "Mumbai", "Kolkata")),
+        ("wheat", 2050, "rising", ("Delhi", "Chandigarh", "Ludhiana")),
+        ("cotton", 6800, "falling", ("Ahmedabad", "Mumbai", "Nagpur")),
+        ("sugarcane", 350, "stable", ("Lucknow", "Pune", "Coimbatore")),
+        ("tomato", 1500, "volatile", ("Bangalore", "Delhi", "Mumbai")),
+        ("onion", 1200, "rising", ("Nashik", "Bangalore", "Delhi"))
+    )
+})
+
+class _CropEcon(NamedTuple):
+    yield_q_per_acre: int  # average quintals per acre in India
+    price_q: int  # assumed current price (this would come from market API)
+    roi_months: int
+
+_CROP_ECON = MappingProxyType({
+    "rice": _CropEcon(25, 2100, 6),
+    "wheat": _CropEcon(20, 2050, 6),
+    "cotton": _CropEcon(8, 6800, 4),
+    "sugarcane": _CropEcon(300, 350, 4),
+    "tomato": _CropEcon(150, 1500, 4),
+    "onion": _CropEcon(120, 1200, 4)
+})
+
+# Canonical crop key for every accepted spelling (English + Hindi names)
+_ALIASES = {name.lower(): name for name in _MOCK_PRICES}
+_ALIASES.update({
+    alias.strip(): name
+    for name, info in INDIAN_CROPS.items()
+    for alias in (info.hindi_name, *info.hindi_name.split("/"))
+})
+
+@lru_cache(maxsize=1)
+def _fmt_ts(sec: int) -> str:
+    """Format a unix second as 'YYYY-MM-DD HH:MM:SS' (reused within the same second)"""
+    t = time.localtime(sec)
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d} {t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
 
 class MarketService:
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         # Indian government APIs for market prices
         self.agmarknet_url = "https://api.data.gov.in/resource"
+        # None = use the process-wide pooled client (see http_client.py)
+        self._client = client
+
+    def _http(self) -> httpx.AsyncClient:
+        return self._client or get_client()
         
     async def get_market_prices(self, crop: str, state: str = "") -> Dict[str, Any]:
         """Get current market prices for crops in India"""
-        try:
-            # Mock market data - in production, integrate with actual APIs
-            mock_prices = {
-                "rice": {"price_per_quintal": 2100, "trend": "stable", "markets": ["Delhi", "Mumbai", "Kolkata"]},
-                "wheat": {"price_per_quintal": 2050, "trend": "rising", "markets": ["Delhi", "Chandigarh", "Ludhiana"]},
-                "cotton": {"price_per_quintal": 6800, "trend": "falling", "markets": ["Ahmedabad", "Mumbai", "Nagpur"]},
-                "sugarcane": {"price_per_quintal": 350, "trend": "stable", "markets": ["Lucknow", "Pune", "Coimbatore"]},
-                "tomato": {"price_per_quintal": 1500, "trend": "volatile", "markets": ["Bangalore", "Delhi", "Mumbai"]},
-                "onion": {"price_per_quintal": 1200, "trend": "rising", "markets": ["Nashik", "Bangalore", "Delhi"]}
-            }
-            
-            crop_lower = crop.lower()
-            if crop_lower in mock_prices:
-                return {
-                    "crop": crop,
-                    "data": mock_prices[crop_lower],
-                    "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "source": "Market Intelligence"
-                }
-            else:
-                return {"error": f"Price data not available for {crop}"}
-                
-        except Exception as e:
-            return {"error": str(e)}
+        # In production, fetch live prices via `self._http()`
+        key = _ALIASES.get(crop.strip().lower())
+        prices = _MOCK_PRICES.get(key)
+        if prices is None:
+            return {"error": f"Price data not available for {crop}"}
+
+        return {
+            "crop": crop,
+            "data": prices,
+            "last_updated": _fmt_ts(int(time.time())),
+            "source": "Market Intelligence"
+        }
     
     def calculate_profitability(self, crop: str, area_acres: float, investment: float) -> Dict[str, Any]:
         """Calculate crop profitability for Indian farmers"""
-        try:
-            # Average yields per acre for different crops in India
-            avg_yields = {
-                "rice": 25,  # quintals per acre
-                "wheat": 20,
-                "cotton": 8,
-                "sugarcane": 300,
-                "tomato": 150,
-                "onion": 120
-            }
-            
-            # Get current market price
-            crop_lower = crop.lower()
-            if crop_lower not in avg_yields:
-                return {"error": "Crop data not available"}
-            
-            # Mock calculation
-            yield_per_acre = avg_yields[crop_lower]
-            total_yield = yield_per_acre * area_acres
-            
-            # Assume current price (this would come from market API)
-            price_per_quintal = {
-                "rice": 2100, "wheat": 2050, "cotton": 6800,
-                "sugarcane": 350, "tomato": 1500, "onion": 1200
-            }.get(crop_lower, 1000)
-            
-            gross_income = total_yield * price_per_quintal
-            net_profit = gross_income - investment
-            profit_margin = (net_profit / investment) * 100 if investment > 0 else 0
-            
-            return {
-                "crop": crop,
-                "area_acres": area_acres,
-                "expected_yield_quintals": total_yield,
-                "price_per_quintal": price_per_quintal,
-                "gross_income": gross_income,
-                "investment": investment,
-                "net_profit": net_profit,
-                "profit_margin_percent": round(profit_margin, 2),
-                "roi_months": 6 if crop_lower in ["rice", "wheat"] else 4
-            }
-            
-        except Exception as e:
-            return {"error": str(e)}
+        if area_acres <= 0:
+            return {"error": "Area must be greater than 0 acres"}
+        if investment < 0:
+            return {"error": "Investment cannot be negative"}
+
+        econ = _CROP_ECON.get(_ALIASES.get(crop.strip().lower()))
+        if econ is None:
+            return {"error": "Crop data not available"}
+        
+        # Mock calculation
+        total_yield = econ.yield_q_per_acre * area_acres
+        gross_income = total_yield * econ.price_q
+        net_profit = gross_income - investment
+        profit_margin = (net_profit / investment) * 100 if investment > 0 else 0
+        
+        return {
+            "crop": crop,
+            "area_acres": area_acres,
+            "expected_yield_quintals": total_yield,
+            "price_per_quintal": econ.price_q,
+            "gross_income": gross_income,
+            "investment": investment,
+            "net_profit": net_profit,
+            "profit_margin_percent": round(profit_margin, 2),
+            "roi_months": econ.roi_months
+        }
@@ -1,5 +1,5 @@
 import requests
-import json
+import orjson
 import base64
 from io import BytesIO
 from PIL import Image, ImageDraw
@@ -38,14 +38,14 @@ def test_health_check():
     }
     
     try:
-        response = requests.post(BASE_URL, headers=headers, json=payload, timeout=30)
+        response = requests.post(BASE_URL, headers=headers, data=orjson.dumps(payload), timeout=30)
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             result = data.get("result", {})
             print("✅ Health check working!")
-            print(f"🌾 Server Status: {result.get('content', [{}])[0].get('text', 'No response') if 'content' in result else json.dumps(result, indent=2)}")
+            print(f"🌾 Server Status: {result.get('content', [{}])[0].get('text', 'No response') if 'content' in result else orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()}")
         else:
             print(f"❌ Error: {response.text}")
     except Exception as e:
@@ -70,11 +70,11 @@ def test_weather_tool():
     }
     
     try:
-        response = requests.post(BASE_URL, headers=headers, json=payload, timeout=30)
+        response = requests.post(BASE_URL, headers=headers, data=orjson.dumps(payload), timeout=30)
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             result = data.get("result", {})
             print("✅ Weather tool working!")
             
@@ -86,7 +86,7 @@ def test_weather_tool():
                         print(f"📍 Response preview: {text[:200]}...")
             else:
                 # Direct result format
-                print(f"📊 Result: {json.dumps(result, indent=2)[:300]}...")
+                print(f"📊 Result: {orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()[:300]}...")
         else:
             print(f"❌ Error: {response.text}")
     except Exception as e:
@@ -112,11 +112,11 @@ def test_market_tool():
     }
     
     try:
-        response = requests.post(BASE_URL, headers=headers, json=payload, timeout=30)
+        response = requests.post(BASE_URL, headers=headers, data=orjson.dumps(payload), timeout=30)
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             result = data.get("result", {})
             print("✅ Market analysis tool working!")
             
@@ -126,7 +126,7 @@ def test_market_tool():
                         text = content_item.get("text", "")
                         print(f"💰 Response preview: {text[:200]}...")
             else:
-                print(f"📊 Result: {json.dumps(result, indent=2)[:300]}...")
+                print(f"📊 Result: {orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()[:300]}...")
         else:
             print(f"❌ Error: {response.text}")
     except Exception as e:
@@ -147,11 +147,11 @@ def test_openai_connection():
     }
     
     try:
-        response = requests.post(BASE_URL, headers=headers, json=payload, timeout=30)
+        response = requests.post(BASE_URL, headers=headers, data=orjson.dumps(payload), timeout=30)
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             result = data.get("result", {})
             print("✅ OpenAI connection test working!")
             
@@ -161,7 +161,7 @@ def test_openai_connection():
                         text = content_item.get("text", "")
                         print(f"🤖 Response: {text[:150]}...")
             else:
-                print(f"📊 Result: {json.dumps(result, indent=2)[:200]}...")
+                print(f"📊 Result: {orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()[:200]}...")
         else:
             print(f"❌ Error: {response.text}")
     except Exception as e:
@@ -186,11 +186,11 @@ def test_farming_calendar():
     }
     
     try:
-        response = requests.post(BASE_URL, headers=headers, json=payload, timeout=30)
+        response = requests.post(BASE_URL, headers=headers, data=orjson.dumps(payload), timeout=30)
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             result = data.get("result", {})
             print("✅ Farming calendar tool working!")
             
@@ -200,7 +200,7 @@ def test_farming_calendar():
                         text = content_item.get("text", "")
                         print(f"📅 Response preview: {text[:200]}...")
             else:
-                print(f"📊 Result: {json.dumps(result, indent=2)[:300]}...")
+                print(f"📊 Result: {orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()[:300]}...")
         else:
             print(f"❌ Error: {response.text}")
     except Exception as e:
@@ -1,16 +1,14 @@
 import asyncio
 import json
 import base64
-import os
 from io import BytesIO
 from PIL import Image, ImageDraw
-from dotenv import load_dotenv
 
 # Load environment variables FIRST
-load_dotenv()
+from config import API_KEY, OPENAI_MODEL
 
 # Test if OpenAI API key is loaded
-api_key = os.getenv("OPENAI_API_KEY")
+api_key = API_KEY
 print(f"✅ API Key loaded: {'Yes' if api_key else 'No'}")
 if api_key:
     print(f"✅ API Key starts with: {api_key[:10]}...")
@@ -23,7 +21,7 @@ from market_service import MarketService
 if api_key:
     from mcp_server import CropAnalysisRequest, PlantingScheduleRequest
     # Import OpenAI client and other necessities
-    from openai import OpenAI
+    from openai import AsyncOpenAI
     from crop_database import INDIAN_CROPS
 
 async def test_weather_service():
@@ -103,11 +101,11 @@ async def test_openai_integration():
     print("🔬 Testing OpenAI Integration...")
     
     try:
-        client = OpenAI(api_key=api_key)
+        client = AsyncOpenAI(api_key=api_key)
         
         # Test a simple agriculture-related query
-        response = client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o"),
+        response = await client.chat.completions.create(
+            model=OPENAI_MODEL,
             messages=[{
                 "role": "user",
                 "content": "Provide 3 quick tips for rice farming in Punjab, India. Include both English and Hindi."
@@ -136,10 +134,10 @@ def test_crop_database():
         for crop in test_crops:
             if crop in INDIAN_CROPS:
                 crop_data = INDIAN_CROPS[crop]
-                print(f"🌾 {crop} ({crop_data['hindi_name']})")
-                print(f"   Season: {crop_data['seasons'][0]}")
-                print(f"   Planting months: {crop_data['planting_months']}")
-                print(f"   Suitable states: {crop_data['suitable_states'][:3]}...")
+                print(f"🌾 {crop} ({crop_data.hindi_name})")
+                print(f"   Season: {crop_data.seasons[0]}")
+                print(f"   Planting months: {crop_data.planting_months}")
+                print(f"   Suitable states: {crop_data.suitable_states[:3]}...")
         
         print("✅ Crop database working!")
         return True
@@ -191,4 +189,10 @@ async def main():
     print("3. Integrate with Puch AI WhatsApp")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Same event loop the server runs on (uvloop isn't on Windows)
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -1,11 +1,155 @@
+import asyncio
 import httpx
+import logging
+import orjson
 import os
-from typing import Dict, Any, Optional
+import random
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Awaitable, Dict, Any, List, Optional, Sequence, Set, Tuple
+
+from http_client import get_client
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Head start for the preferred provider before the backups are fired (seconds)
+HEDGE_DELAY = 0.15
+
+# Once a lower-priority provider has answered, how long to wait for a better one (seconds)
+PREFERRED_GRACE = 0.3
+
+# Open-Meteo needs lat/lon - you'd need to geocode city to lat/lon first,
+# for major Indian cities the coordinates are hardcoded (lowercase keys)
+_CITY_COORDS = MappingProxyType({
+    "delhi": (28.6139, 77.2090),
+    "mumbai": (19.0760, 72.8777),
+    "bangalore": (12.9716, 77.5946),
+    "chennai": (13.0827, 80.2707),
+    "kolkata": (22.5726, 88.3639),
+    "hyderabad": (17.3850, 78.4867),
+    "pune": (18.5204, 73.8567),
+    "ahmedabad": (23.0225, 72.5714)
+})
+
+# Open-Meteo query fields that never change between calls
+_OM_STATIC_PARAMS = MappingProxyType({
+    "current": "temperature_2m,relative_humidity_2m,wind_speed_10m,precipitation",
+    "hourly": "temperature_2m,relative_humidity_2m,precipitation",
+    "timezone": "Asia/Kolkata"
+})
+
+# Live provider results are reused for this long - weather moves on the order of minutes
+WEATHER_CACHE_TTL = 300
+
+# What a broken provider raises: transport/status errors, bad JSON or a non-object payload
+PROVIDER_ERRORS = (httpx.HTTPError, ValueError)
+
+# Per-provider budgets, tighter than the shared client's 5s default: IMD is the slow one,
+# Open-Meteo is consistently fast - these also bound how long the hedged race waits
+WU_TIMEOUT = httpx.Timeout(connect=1.0, read=2.5, write=1.0, pool=0.5)
+IMD_TIMEOUT = httpx.Timeout(connect=1.0, read=4.0, write=1.0, pool=0.5)
+OM_TIMEOUT = httpx.Timeout(connect=1.0, read=1.5, write=1.0, pool=0.5)
+
+# Transient statuses worth another attempt - other 4xx are final
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+# Fallback payloads when every provider is down - shared across calls, so callers must not mutate them
+_MOCK_WEATHER_BASE = {
+    "temp": 28.5,
+    "humidity": 75,
+    "pressure": 1013,
+    "weather": [{"main": "Clear", "description": "clear sky"}],
+    "wind": {"speed": 3.2},
+    "rain": {"1h": 0}
+}
+_MOCK_FORECAST = {
+    "list": [
+        {
+            "main": {"temp": 29, "humidity": 70},
+            "weather": [{"main": "Clouds", "description": "few clouds"}],
+            "dt_txt": "2025-09-03 12:00:00"
+        }
+    ]
+}
+
+# Irrigation advice, indexed by get_irrigation_recommendation: rain, extreme heat, hot, favorable, no data
+_IRRIGATION_ADVICE = (
+    "🌧️ बारिश के कारण सिंचाई की आवश्यकता नहीं। Due to rain, no irrigation needed today.",
+    "🔥 अत्यधिक गर्मी - तुरंत सिंचाई करें। Extreme heat - irrigate immediately.",
+    "☀️ गर्म मौसम - शाम को सिंचाई करें। Hot weather - irrigate in evening.",
+    "🌤️ मौसम अनुकूल है - नियमित सिंचाई करें। Weather is favorable - regular irrigation.",
+    "मौसम डेटा उपलब्ध नहीं। Weather data not available - follow regular irrigation schedule."
+)
+
+def _status_error(response: httpx.Response) -> Optional[str]:
+    """None for a 2xx. Outages (5xx, 429) raise so the provider's breaker counts them;
+    any other status (e.g. 404 for a misspelled city) comes from the request, not the
+    provider, and is returned as a message instead"""
+    if response.is_success:
+        return None
+    if response.status_code >= 500 or response.status_code == 429:
+        response.raise_for_status()
+    return f"HTTP {response.status_code}"
+
+def _json_object(response: httpx.Response) -> Dict[str, Any]:
+    """Decode a provider's JSON body, rejecting anything that isn't an object"""
+    data = orjson.loads(response.content)
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+    return data
+
+@dataclass
+class _CircuitBreaker:
+    """Per-provider breaker: after repeated failures, skip the provider instead of
+    paying its timeout on every request; one probe call is let through after reset_timeout"""
+    failures: int = 0
+    state: str = "CLOSED"  # CLOSED -> OPEN -> HALF_OPEN -> CLOSED/OPEN
+    opened_at: float = 0.0
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+    def allow(self) -> bool:
+        if self.state == "CLOSED":
+            return True
+        if self.state == "OPEN" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "HALF_OPEN"  # this caller is the probe
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = "CLOSED"
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "HALF_OPEN" or self.failures >= self.failure_threshold:
+            self.state = "OPEN"
+            self.opened_at = time.monotonic()
+
+    async def call(self, coro: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Await a provider call, counting exceptions (timeouts, connection errors) as failures"""
+        try:
+            result = await coro
+        except asyncio.CancelledError:
+            if self.state == "HALF_OPEN":
+                # Probe abandoned - back to OPEN for a fresh reset_timeout, not a probe per request
+                self.state = "OPEN"
+                self.opened_at = time.monotonic()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
 
 class WeatherService:
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         # Weather Union API (no key required for basic usage)
         self.weather_union_url = "https://www.weatherunion.com/api/v1"
+        self._wu_current_url = f"{self.weather_union_url}/current"
         
         # IMD APIs (no key required)
         self.imd_current_url = "https://mausam.imd.gov.in/api/current_wx_api.php"
@@ -13,167 +157,256 @@ class WeatherService:
         
         # Fallback: Open-Meteo (no key required)
         self.open_meteo_url = "https://api.open-meteo.com/v1"
+        self._om_forecast_url = f"{self.open_meteo_url}/forecast"
+
+        # None = use the process-wide pooled client (see http_client.py)
+        self._client = client
+        
+        # One circuit breaker per upstream
+        self._cb_wu = _CircuitBreaker()
+        self._cb_imd = _CircuitBreaker()
+        self._cb_om = _CircuitBreaker()
+        
+        # (city, state) -> live provider result, LRU-bounded
+        self._cache = TTLCache(maxsize=512, ttl=WEATHER_CACHE_TTL)
+        
+        # Provider calls that lost the race, left to finish so their breaker sees the outcome
+        self._background: Set[asyncio.Task] = set()
+
+    def _http(self) -> httpx.AsyncClient:
+        return self._client or get_client()
     
     async def get_weather_data(self, city: str, state: str = "") -> Dict[str, Any]:
         """Get current weather data for Indian location using multiple sources"""
+        key = (city.strip().lower(), state.strip().lower())
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit
+        
+        # Pooled keep-alive client - no TCP/TLS handshake on repeat calls
+        client = self._http()
+
+        # Providers in priority order: Weather Union (best for India), then IMD, then
+        # Open-Meteo - latency is the fastest success, not the sum of failures
+        providers = (
+            ("Weather Union", self._cb_wu, lambda: self._get_weather_union_data(client, city, state)),
+            ("IMD API", self._cb_imd, lambda: self._get_imd_data(client, city)),
+            ("Open-Meteo", self._cb_om, lambda: self._get_open_meteo_data(client, city, state))
+        )
+        names = []
+        tasks = []
         try:
-            location = f"{city},{state}" if state else city
+            for name, breaker, fetch in providers:
+                if not breaker.allow():  # open circuit - skip a provider that's down
+                    continue
+                names.append(name)
+                tasks.append(asyncio.create_task(breaker.call(fetch())))
+                if len(tasks) == 1:
+                    # Hedge: the preferred provider gets a head start, backups only fire
+                    # if it hasn't answered usefully within HEDGE_DELAY
+                    done, _ = await asyncio.wait(tasks, timeout=HEDGE_DELAY)
+                    if done and tasks[0].exception() is None:
+                        first = tasks[0].result()
+                        if first and "error" not in first:
+                            break
+            data = await self._best_result(tasks, names)
+        finally:
+            # Losers aren't cancelled: each runs out its own provider timeout in the
+            # background, so a hung provider still counts as a failure and trips its breaker
+            for task in tasks:
+                if not task.done():
+                    self._background.add(task)
+                    task.add_done_callback(self._drop_background)
+        if data is not None:
+            self._cache.set(key, data)  # mock fallbacks aren't cached - retry live next time
+            return data
+        
+        # If all fail, return mock data
+        return {
+            "current": self._get_mock_weather_data(city),
+            "forecast": self._get_mock_forecast_data(),
+            "location": f"{city},{state}" if state else city,
+            "source": "mock_data"
+        }
+    
+    def _drop_background(self, task: asyncio.Task) -> None:
+        """Discard a finished race loser - its result is unused, the breaker already counted it"""
+        self._background.discard(task)
+        if not task.cancelled():
+            task.exception()  # mark retrieved - no "Task exception was never retrieved"
+    
+    async def get_weather_data_many(
+        self,
+        locations: Sequence[Tuple[str, str]],
+        max_concurrency: int = 32
+    ) -> List[Dict[str, Any]]:
+        """Weather for many (city, state) pairs at once, in input order - bounded so a big
+        batch can't exhaust the connection pool"""
+        sem = asyncio.Semaphore(max_concurrency)
+        
+        async def one(city: str, state: str) -> Dict[str, Any]:
+            async with sem:
+                return await self.get_weather_data(city, state)
+        
+        return await asyncio.gather(*(one(city, state) for city, state in locations))
+    
+    async def _best_result(self, tasks: List[asyncio.Task], names: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """Highest-priority valid provider result, waiting at most PREFERRED_GRACE for a
+        better-ranked provider once any valid result is in hand"""
+        loop = asyncio.get_running_loop()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+        pending = set(tasks)
+        deadline = None
+        
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break  # grace period over - settle for what we have
             
-            async with httpx.AsyncClient() as client:
-                # Try Weather Union first (best for India)
+            for task in done:
+                i = tasks.index(task)
                 try:
-                    weather_union_data = await self._get_weather_union_data(client, city, state)
-                    if weather_union_data and "error" not in weather_union_data:
-                        return weather_union_data
-                except Exception as e:
-                    print(f"Weather Union failed: {e}")
-                
-                # Fallback to IMD APIs
-                try:
-                    imd_data = await self._get_imd_data(client, city)
-                    if imd_data and "error" not in imd_data:
-                        return imd_data
-                except Exception as e:
-                    print(f"IMD API failed: {e}")
-                
-                # Final fallback to Open-Meteo
-                try:
-                    open_meteo_data = await self._get_open_meteo_data(client, city, state)
-                    if open_meteo_data and "error" not in open_meteo_data:
-                        return open_meteo_data
-                except Exception as e:
-                    print(f"Open-Meteo failed: {e}")
-                
-                # If all fail, return mock data
-                return {
-                    "current": self._get_mock_weather_data(city),
-                    "forecast": self._get_mock_forecast_data(),
-                    "location": location,
-                    "source": "mock_data"
-                }
-                
-        except Exception as e:
-            return {"error": str(e), "location": location}
+                    data = task.result()
+                except PROVIDER_ERRORS as e:
+                    logger.warning("%s failed: %s", names[i], e)
+                    continue
+                except Exception:
+                    # A bug in one provider's handling mustn't sink the others or the mock fallback
+                    logger.exception("%s raised unexpectedly", names[i])
+                    continue
+                if data and "error" not in data:
+                    results[i] = data
+            
+            # Return as soon as every provider ranked above the best result has finished
+            for i, task in enumerate(tasks):
+                if results[i] is not None:
+                    return results[i]
+                if not task.done():
+                    break
+            
+            if deadline is None and any(r is not None for r in results):
+                deadline = loop.time() + PREFERRED_GRACE
+        
+        return next((r for r in results if r is not None), None)
+    
+    async def _request_with_retry(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Any = httpx.USE_CLIENT_DEFAULT,
+        max_attempts: int = 3,
+        initial_delay: float = 0.2,
+        factor: float = 2,
+        max_delay: float = 2.0
+    ) -> httpx.Response:
+        """Send a request, retrying transient statuses with jittered exponential backoff"""
+        for attempt in range(max_attempts):
+            response = await client.request(method, url, params=params, timeout=timeout)
+            if response.status_code not in RETRYABLE_STATUSES or attempt == max_attempts - 1:
+                return response
+            await asyncio.sleep(min(max_delay, initial_delay * factor ** attempt) * (0.5 + random.random()))
+        return response
     
     async def _get_weather_union_data(self, client: httpx.AsyncClient, city: str, state: str) -> Dict[str, Any]:
         """Get data from Weather Union API"""
         # Note: You'll need to check Weather Union documentation for exact endpoints
         # This is a placeholder structure
-        url = f"{self.weather_union_url}/current"
-        params = {"city": city, "state": state}
-        
-        response = await client.get(url, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                "current": {
-                    "temp": data.get("temperature"),
-                    "humidity": data.get("humidity"),
-                    "pressure": data.get("pressure"),
-                    "weather": [{"main": data.get("weather_condition", "Clear")}],
-                    "wind": {"speed": data.get("wind_speed", 0)},
-                    "rain": {"1h": data.get("rainfall", 0)}
-                },
-                "location": f"{city}, {state}",
-                "source": "weather_union"
-            }
-        return {"error": "Weather Union API failed"}
+        response = await self._request_with_retry(
+            client, "GET", self._wu_current_url, params={"city": city, "state": state}, timeout=WU_TIMEOUT
+        )
+        error = _status_error(response)
+        if error:
+            return {"error": f"Weather Union API failed: {error}"}
+        data = _json_object(response)
+        return {
+            "current": {
+                "temp": data.get("temperature"),
+                "humidity": data.get("humidity"),
+                "pressure": data.get("pressure"),
+                "weather": [{"main": data.get("weather_condition", "Clear")}],
+                "wind": {"speed": data.get("wind_speed", 0)},
+                "rain": {"1h": data.get("rainfall", 0)}
+            },
+            "location": f"{city}, {state}",
+            "source": "weather_union"
+        }
     
     async def _get_imd_data(self, client: httpx.AsyncClient, city: str) -> Dict[str, Any]:
         """Get data from IMD APIs"""
-        # Current weather from IMD
-        current_response = await client.get(f"{self.imd_current_url}?city={city}")
-        forecast_response = await client.get(f"{self.imd_forecast_url}?city={city}")
+        # Current weather + forecast from IMD - independent, so fetched together
+        current_response, forecast_response = await asyncio.gather(
+            self._request_with_retry(client, "GET", self.imd_current_url, params={"city": city}, timeout=IMD_TIMEOUT),
+            self._request_with_retry(client, "GET", self.imd_forecast_url, params={"city": city}, timeout=IMD_TIMEOUT),
+            return_exceptions=True
+        )
+        if isinstance(current_response, BaseException):
+            raise current_response  # no current conditions - the provider failed
         
-        if current_response.status_code == 200:
-            current_data = current_response.json()
-            forecast_data = forecast_response.json() if forecast_response.status_code == 200 else {}
-            
-            return {
-                "current": {
-                    "temp": current_data.get("temperature"),
-                    "humidity": current_data.get("humidity"),
-                    "pressure": current_data.get("pressure"),
-                    "weather": [{"main": current_data.get("weather", "Clear")}],
-                    "wind": {"speed": current_data.get("wind_speed", 0)},
-                    "rain": {"1h": current_data.get("rainfall", 0)}
-                },
-                "forecast": forecast_data,
-                "location": city,
-                "source": "imd_official"
-            }
-        return {"error": "IMD API failed"}
+        error = _status_error(current_response)
+        if error:
+            return {"error": f"IMD API failed: {error}"}
+        current_data = _json_object(current_response)
+        forecast_data = {}
+        if not isinstance(forecast_response, BaseException) and forecast_response.is_success:
+            try:
+                forecast_data = _json_object(forecast_response)
+            except ValueError:
+                pass  # the forecast is optional - keep the current conditions
+        
+        return {
+            "current": {
+                "temp": current_data.get("temperature"),
+                "humidity": current_data.get("humidity"),
+                "pressure": current_data.get("pressure"),
+                "weather": [{"main": current_data.get("weather", "Clear")}],
+                "wind": {"speed": current_data.get("wind_speed", 0)},
+                "rain": {"1h": current_data.get("rainfall", 0)}
+            },
+            "forecast": forecast_data,
+            "location": city,
+            "source": "imd_official"
+        }
     
     async def _get_open_meteo_data(self, client: httpx.AsyncClient, city: str, state: str) -> Dict[str, Any]:
         """Get data from Open-Meteo (requires lat/lon)"""
-        # You'd need to geocode city to lat/lon first
-        # For major Indian cities, you can hardcode coordinates
-        city_coords = {
-            "delhi": {"lat": 28.6139, "lon": 77.2090},
-            "mumbai": {"lat": 19.0760, "lon": 72.8777},
-            "bangalore": {"lat": 12.9716, "lon": 77.5946},
-            "chennai": {"lat": 13.0827, "lon": 80.2707},
-            "kolkata": {"lat": 22.5726, "lon": 88.3639},
-            "hyderabad": {"lat": 17.3850, "lon": 78.4867},
-            "pune": {"lat": 18.5204, "lon": 73.8567},
-            "ahmedabad": {"lat": 23.0225, "lon": 72.5714}
-        }
-        
-        coords = city_coords.get(city.lower())
+        coords = _CITY_COORDS.get(city.strip().lower())
         if not coords:
             return {"error": f"Coordinates not found for {city}"}
+        lat, lon = coords
         
-        url = f"{self.open_meteo_url}/forecast"
-        params = {
-            "latitude": coords["lat"],
-            "longitude": coords["lon"],
-            "current": "temperature_2m,relative_humidity_2m,wind_speed_10m,precipitation",
-            "hourly": "temperature_2m,relative_humidity_2m,precipitation",
-            "timezone": "Asia/Kolkata"
-        }
+        params = {"latitude": lat, "longitude": lon, **_OM_STATIC_PARAMS}
+        response = await self._request_with_retry(client, "GET", self._om_forecast_url, params=params, timeout=OM_TIMEOUT)
+        error = _status_error(response)
+        if error:
+            return {"error": f"Open-Meteo API failed: {error}"}
+        data = _json_object(response)
+        current = data.get("current", {})
         
-        response = await client.get(url, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            current = data.get("current", {})
-            
-            return {
-                "current": {
-                    "temp": current.get("temperature_2m"),
-                    "humidity": current.get("relative_humidity_2m"),
-                    "weather": [{"main": "Clear"}],
-                    "wind": {"speed": current.get("wind_speed_10m", 0)},
-                    "rain": {"1h": current.get("precipitation", 0)}
-                },
-                "forecast": data.get("hourly", {}),
-                "location": f"{city}, {state}",
-                "source": "open_meteo"
-            }
-        return {"error": "Open-Meteo API failed"}
-    
-    def _get_mock_weather_data(self, city: str) -> Dict[str, Any]:
-        """Mock weather data for demonstration"""
         return {
-            "temp": 28.5,
-            "humidity": 75,
-            "pressure": 1013,
-            "weather": [{"main": "Clear", "description": "clear sky"}],
-            "wind": {"speed": 3.2},
-            "rain": {"1h": 0},
-            "name": city
+            "current": {
+                "temp": current.get("temperature_2m"),
+                "humidity": current.get("relative_humidity_2m"),
+                "weather": [{"main": "Clear"}],
+                "wind": {"speed": current.get("wind_speed_10m", 0)},
+                "rain": {"1h": current.get("precipitation", 0)}
+            },
+            "forecast": data.get("hourly", {}),
+            "location": f"{city}, {state}",
+            "source": "open_meteo"
         }
     
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _get_mock_weather_data(city: str) -> Dict[str, Any]:
+        """Mock weather data for demonstration (cached per city, shared - read-only)"""
+        return {**_MOCK_WEATHER_BASE, "name": city}
+    
     def _get_mock_forecast_data(self) -> Dict[str, Any]:
-        """Mock forecast data for demonstration"""
-        return {
-            "list": [
-                {
-                    "main": {"temp": 29, "humidity": 70},
-                    "weather": [{"main": "Clouds", "description": "few clouds"}],
-                    "dt_txt": "2025-09-03 12:00:00"
-                }
-            ]
-        }
+        """Mock forecast data for demonstration (shared object - read-only)"""
+        return _MOCK_FORECAST
     
     def get_irrigation_recommendation(self, weather_data: Dict[str, Any], crop: str) -> str:
         """Generate irrigation recommendations based on weather"""
@@ -183,14 +416,7 @@ class WeatherService:
             humidity = current.get("humidity", 60)
             rain = current.get("rain", {}).get("1h", 0)
             
-            if rain > 5:
-                return "🌧️ बारिश के कारण सिंचाई की आवश्यकता नहीं। Due to rain, no irrigation needed today."
-            elif humidity < 40 and temp > 35:
-                return "🔥 अत्यधिक गर्मी - तुरंत सिंचाई करें। Extreme heat - irrigate immediately."
-            elif humidity < 60 and temp > 30:
-                return "☀️ गर्म मौसम - शाम को सिंचाई करें। Hot weather - irrigate in evening."
-            else:
-                return "🌤️ मौसम अनुकूल है - नियमित सिंचाई करें। Weather is favorable - regular irrigation."
-                
-        except Exception:
-            return "मौसम डेटा उपलब्ध नहीं। Weather data not available - follow regular irrigation schedule."
+            idx = 0 if rain > 5 else 1 if humidity < 40 and temp > 35 else 2 if humidity < 60 and temp > 30 else 3
+        except (AttributeError, TypeError):
+            idx = 4
+        return _IRRIGATION_ADVICE[idx]